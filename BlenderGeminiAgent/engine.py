@@ -1,19 +1,112 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-import base64
-import io
+import contextlib
+import functools
 import os
 import queue
 import sys
 import tempfile
+import time
 import traceback
 
 import bpy
 
-execution_queue = queue.Queue()
+# SimpleQueue is a reentrant C implementation without the lock/Condition
+# machinery of queue.Queue; producers are the HTTP handler threads and the
+# sole consumer is the process_queue timer (MPSC).
+execution_queue = queue.SimpleQueue()
+
+# Lossy quality for viewport previews; the agent only needs to see the
+# scene, not archive it.
+_VIEW_QUALITY = 80
+
+_view_format = None
+
+
+def _get_view_format():
+    """Pick the cheapest still-image format Blender can write.
+
+    JPEG (or WebP where available) encodes much faster than PNG's DEFLATE
+    pipeline and produces a several-times-smaller payload for what is just
+    an agent preview. Returns (file_format, extension, mime_type).
+    """
+    global _view_format
+    if _view_format is None:
+        formats = bpy.types.ImageFormatSettings.bl_rna.properties['file_format'].enum_items
+        if 'WEBP' in formats:
+            _view_format = ('WEBP', '.webp', 'image/webp')
+        else:
+            _view_format = ('JPEG', '.jpg', 'image/jpeg')
+    return _view_format
+
+
+_render_engine = None
+
+
+def _get_render_engine():
+    """Resolve the Eevee engine identifier once; walking the RNA enum on
+    every render is a needless Python->C round trip."""
+    global _render_engine
+    if _render_engine is None:
+        if hasattr(bpy.types, "RenderSettings") and 'BLENDER_EEVEE_NEXT' in \
+                bpy.types.RenderSettings.bl_rna.properties['engine'].enum_items:
+            _render_engine = 'BLENDER_EEVEE_NEXT'
+        else:
+            _render_engine = 'BLENDER_EEVEE'
+    return _render_engine
+
+
+class _CaptureSink:
+    """Minimal stdout/stderr target: appends chunks, joined once at the end.
+
+    Cheaper than io.StringIO, which routes every print through the
+    TextIOBase machinery.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, s):
+        self._chunks.append(s)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return ''.join(self._chunks)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_script(source):
+    """Compile an agent script, caching the code object.
+
+    The agent frequently resends identical snippets across retry turns;
+    caching skips the lex/parse/compile step on repeats.
+    """
+    return compile(source, '<agent>', 'exec')
+
+
+_view3d_ctx_cache = None
+
+
+def invalidate_view3d_context(*_args):
+    """Drop the cached VIEW_3D override, e.g. after a new file is loaded."""
+    global _view3d_ctx_cache
+    _view3d_ctx_cache = None
 
 
 def get_view3d_context():
+    global _view3d_ctx_cache
+
+    cached = _view3d_ctx_cache
+    if cached is not None:
+        try:
+            if cached['area'].type == 'VIEW_3D':
+                return cached
+        except ReferenceError:
+            pass
+        _view3d_ctx_cache = None
+
     for window in bpy.context.window_manager.windows:
         screen = window.screen
         for area in screen.areas:
@@ -27,76 +120,105 @@ def get_view3d_context():
                             ctx['area'] = area
                             ctx['region'] = region
                             ctx['workspace'] = window.workspace
+                            _view3d_ctx_cache = ctx
                             return ctx
     return None
 
 
+# Bound the work done in one timer tick so a burst of queued tasks cannot
+# hold Blender's main thread for the whole drain.
+_MAX_TASKS_PER_TICK = 4
+_MAX_SECONDS_PER_TICK = 0.05
+
+
 def process_queue():
+    deadline = time.perf_counter() + _MAX_SECONDS_PER_TICK
+    processed = 0
+
     while not execution_queue.empty():
+        if processed >= _MAX_TASKS_PER_TICK or time.perf_counter() > deadline:
+            # More tasks pending: yield to the UI and come straight back.
+            return 0.0
+
         task = execution_queue.get()
+        processed += 1
 
         if task['type'] == 'code':
-            stdout_capture = io.StringIO()
-            stderr_capture = io.StringIO()
-            original_stdout = sys.stdout
-            original_stderr = sys.stderr
-
-            sys.stdout = stdout_capture
-            sys.stderr = stderr_capture
+            sink = _CaptureSink()
 
             try:
-                exec_globals = globals().copy()
-                exec_globals['get_view3d_context'] = get_view3d_context
+                # Drop whatever the previous script defined instead of
+                # rebuilding the whole dict per run.
+                for key in set(_EXEC_GLOBALS) - _EXEC_BASE_KEYS:
+                    del _EXEC_GLOBALS[key]
 
-                exec(task['content'], exec_globals)
+                with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+                    exec(_compile_script(task['content']), _EXEC_GLOBALS)
 
-                output = stdout_capture.getvalue()
+                output = sink.getvalue()
                 task['response_queue'].put({"status": "success", "output": output})
 
                 sys.__stdout__.write(output)
                 print("Executed AI code successfully.")
 
             except Exception as e:
-                error_msg = traceback.format_exc()
+                # Cap the frame count so a deeply recursive script doesn't
+                # balloon the error payload.
+                error_msg = traceback.format_exc(limit=10)
                 task['response_queue'].put({"status": "error", "message": error_msg})
                 print(f"Execution Error: {e}")
 
-            finally:
-                sys.stdout = original_stdout
-                sys.stderr = original_stderr
-
         elif task['type'] == 'view':
             try:
+                file_format, extension, mime_type = _get_view_format()
                 base_path = os.path.join(tempfile.gettempdir(), "agent_view")
-                expected_path = base_path + ".png"
+                expected_path = base_path + extension
 
-                if os.path.exists(expected_path):
-                    os.remove(expected_path)
+                try:
+                    os.unlink(expected_path)
+                except FileNotFoundError:
+                    pass
 
                 if not bpy.context.scene.camera:
                     task['response_queue'].put(
                         {"status": "error", "message": "No camera found. Please create a camera."})
                     continue
 
-                bpy.context.scene.render.image_settings.file_format = 'PNG'
-                bpy.context.scene.render.filepath = base_path
-
-                if hasattr(bpy.types, "RenderSettings") and 'BLENDER_EEVEE_NEXT' in \
-                        bpy.types.RenderSettings.bl_rna.properties['engine'].enum_items:
-                    bpy.context.scene.render.engine = 'BLENDER_EEVEE_NEXT'
-                else:
-                    bpy.context.scene.render.engine = 'BLENDER_EEVEE'
+                # Only assign render settings that actually changed; every
+                # RNA write fires update callbacks inside Blender.
+                render = bpy.context.scene.render
+                settings = render.image_settings
+                if settings.file_format != file_format:
+                    settings.file_format = file_format
+                if settings.quality != _VIEW_QUALITY:
+                    settings.quality = _VIEW_QUALITY
+                if render.filepath != base_path:
+                    render.filepath = base_path
+
+                engine = _get_render_engine()
+                if render.engine != engine:
+                    render.engine = engine
 
                 bpy.ops.render.render(write_still=True)
 
-                if os.path.exists(expected_path):
+                # Hand the raw bytes to the server; base64 only happens there
+                # if a client still asks for the JSON envelope.
+                try:
                     with open(expected_path, "rb") as img_file:
-                        b64_string = base64.b64encode(img_file.read()).decode('utf-8')
-                    task['response_queue'].put({"status": "success", "image_base64": b64_string})
-                else:
+                        image_bytes = img_file.read()
+                except FileNotFoundError:
                     task['response_queue'].put({"status": "error", "message": "Render finished but file not found."})
+                else:
+                    task['response_queue'].put(
+                        {"status": "success", "image_bytes": image_bytes, "mime_type": mime_type})
 
             except Exception as e:
                 task['response_queue'].put({"status": "error", "message": str(e)})
 
     return 0.1
+
+
+# Shared globals for agent scripts, built once at import instead of copying
+# the module dict on every run.
+_EXEC_GLOBALS = {**globals(), 'get_view3d_context': get_view3d_context}
+_EXEC_BASE_KEYS = frozenset(_EXEC_GLOBALS)
@@ -2,7 +2,7 @@
 
 import bpy
 
-from .engine import process_queue
+from .engine import invalidate_view3d_context, process_queue
 from .server import start_server, stop_server, PORT
 
 
@@ -39,8 +39,12 @@ classes = (
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
+    if invalidate_view3d_context not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(invalidate_view3d_context)
 
 
 def unregister():
+    if invalidate_view3d_context in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(invalidate_view3d_context)
     for cls in classes:
         bpy.utils.unregister_class(cls)
@@ -2,26 +2,86 @@
 
 import http.server
 import json
+import os
 import queue
+import socket
 import socketserver
 import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # Optional SIMD (AVX2/SSSE3) base64 codec; drop-in stdlib API.
+    import pybase64 as base64
+except ImportError:
+    import base64
 
 from .engine import execution_queue
 
 PORT = 8081
-server_thread = None
-httpd = None
+_servers = []
+_threads = []
+
+
+_REQUEST_WORKERS = 8
+_request_pool = ThreadPoolExecutor(max_workers=_REQUEST_WORKERS)
+
+
+def _warm_request_pool():
+    """Spawn every pool worker up front, from the unpinned caller.
+
+    Threads inherit their creator's CPU mask on Linux; left to lazy
+    spawning, workers would be created from inside the pinned listener
+    thread and the whole HTTP layer would share one core. The event keeps
+    each warm-up task occupied until all workers exist.
+    """
+    release = threading.Event()
+    for _ in range(_REQUEST_WORKERS):
+        _request_pool.submit(release.wait)
+    release.set()
+
+
+class AgentTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    # Handle each request off the listener thread so a slow /view render
+    # does not block concurrent /run requests. Requests are submitted to a
+    # bounded pool rather than spawning an unbounded thread per connection.
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def server_bind(self):
+        # SO_REUSEPORT lets several listener sockets share the port with
+        # the kernel load-balancing accepts between them.
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def process_request(self, request, client_address):
+        _request_pool.submit(self.process_request_thread, request, client_address)
 
 
 class AgentRequestHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connection open between tool calls; _send_json
+    # always writes Content-Length, which keep-alive requires.
+    protocol_version = "HTTP/1.1"
+    # Close keep-alive connections idle this long. Each open connection
+    # parks a pool worker in readline between requests; without a timeout,
+    # 8 idle clients would occupy every worker and starve new sockets.
+    timeout = 60
+
+    def setup(self):
+        super().setup()
+        # Responses are small and latency-sensitive; don't let Nagle hold them.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
     def do_POST(self):
         try:
             content_length = int(self.headers.get('Content-Length', 0))
-            post_data = self.rfile.read(content_length)
+            # Read straight into a preallocated buffer; json.loads accepts
+            # the bytearray without another copy.
+            post_data = bytearray(content_length)
+            self.rfile.readinto(post_data)
             data = json.loads(post_data)
 
-            res_q = queue.Queue()
+            res_q = queue.SimpleQueue()
 
             if self.path == '/run':
                 code = data.get('code', '')
@@ -39,9 +99,20 @@ class AgentRequestHandler(http.server.BaseHTTPRequestHandler):
 
                 try:
                     result = res_q.get(timeout=30)
-                    self._send_json(200, result)
                 except queue.Empty:
                     self._send_json(504, {"status": "error", "message": "Render timed out"})
+                else:
+                    if result.get('status') != 'success':
+                        self._send_json(200, result)
+                    elif self.headers.get('Accept', '').startswith('image/'):
+                        # Binary transport: no base64 inflation or decode.
+                        self._send_image(result['image_bytes'], result['mime_type'])
+                    else:
+                        # Legacy JSON envelope for clients without the
+                        # Accept header.
+                        image_bytes = result.pop('image_bytes')
+                        result['image_base64'] = base64.b64encode(image_bytes).decode('ascii')
+                        self._send_json(200, result)
 
             else:
                 self._send_json(404, {"status": "error", "message": "Not found"})
@@ -50,32 +121,63 @@ class AgentRequestHandler(http.server.BaseHTTPRequestHandler):
             print(f"Server Error: {e}")
             self._send_json(500, {"status": "error", "message": str(e)})
 
+    def _send_image(self, body, mime_type):
+        head = (
+            f"{self.protocol_version} 200 OK\r\n"
+            f"Content-Type: {mime_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode('latin-1')
+        self.wfile.write(head + body)
+
     def _send_json(self, code, data):
-        self.send_response(code)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        # Assemble status line, headers and body into one buffer so the
+        # whole response goes out in a single sendall.
+        body = json.dumps(data).encode()
+        reason = self.responses.get(code, ('',))[0]
+        head = (
+            f"{self.protocol_version} {code} {reason}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode('latin-1')
+        self.wfile.write(head + body)
+
+
+def _serve(server):
+    if hasattr(os, 'sched_setaffinity'):
+        # Pin the listener thread to one core (pid 0 = calling thread on
+        # Linux) so its cache state stays warm instead of migrating.
+        try:
+            os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+        except OSError:
+            pass
+    server.serve_forever()
 
 
 def start_server():
-    global httpd, server_thread
-    if httpd: return
+    if _servers: return
+    _warm_request_pool()
     Handler = AgentRequestHandler
-    socketserver.TCPServer.allow_reuse_address = True
+    listener_count = 2 if hasattr(socket, 'SO_REUSEPORT') else 1
     try:
-        httpd = socketserver.TCPServer(("", PORT), Handler)  # type: ignore[arg-type]
+        for _ in range(listener_count):
+            _servers.append(AgentTCPServer(("", PORT), Handler))  # type: ignore[arg-type]
         print(f"Serving on port {PORT}")
-        server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
-        server_thread.start()
-    except OSError as e:
+        for server in _servers:
+            thread = threading.Thread(target=_serve, args=(server,), daemon=True)
+            thread.start()
+            _threads.append(thread)
+    except OSError:
         print(f"Port {PORT} is already in use.")
-        httpd = None
+        for server in _servers:
+            server.server_close()
+        _servers.clear()
 
 
 def stop_server():
-    global httpd, server_thread
-    if httpd:
-        httpd.shutdown()
-        httpd.server_close()
-        httpd = None
-        server_thread = None
+    for server in _servers:
+        server.shutdown()
+        server.server_close()
+    _servers.clear()
+    _threads.clear()
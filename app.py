@@ -1,3 +1,5 @@
+from collections import deque
+
 import google.generativeai as genai
 import streamlit as st
 
@@ -14,26 +16,50 @@ server_url = st.sidebar.text_input("Blender Server URL", value=DEFAULT_SERVER_UR
 model_name = st.sidebar.selectbox("Model Name", ["gemini-3-pro-preview", "gemini-2.5-flash", ])
 max_turns = st.sidebar.slider("Max Retry Turns", min_value=1, max_value=10, value=5)
 
-agent = GeminiAgent(server_url)
+if st.session_state.get("script_cache") is not None:
+    st.sidebar.caption(
+        f"Script cache: {st.session_state.script_cache_hits} hits / "
+        f"{st.session_state.script_cache_misses} misses"
+    )
+
+@st.cache_resource
+def _get_agent(url: str) -> GeminiAgent:
+    """One agent — and one Blender connection pool — per server URL."""
+    return GeminiAgent(url)
+
+
+agent = _get_agent(server_url)
 tools = [agent.run_blender_script, agent.get_viewport_screenshot]
 
 if "messages" not in st.session_state:
-    st.session_state.messages = []  # Store chat history
+    # Chat history, bounded so a marathon session can't grow rerun cost
+    # and memory without limit.
+    st.session_state.messages = deque(maxlen=200)
 if "chat_session" not in st.session_state:
     st.session_state.chat_session = None
 
 st.title("🤖 Blender Gemini Agent")
 st.caption("Autonomous 3D Modeling Agent powered by Gemini 3")
 
+@st.cache_resource
+def _get_model(api_key: str, model_name: str, _tools):
+    """Configure the SDK and build the model once per (key, model) pair.
+
+    Reruns hit the cache instead of re-running genai.configure and the
+    tool-schema introspection; _tools is excluded from the cache key.
+    """
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(
+        model_name=model_name,
+        tools=_tools,
+        system_instruction=SYSTEM_INSTRUCTION
+    )
+
+
 if api_key:
     try:
-        genai.configure(api_key=api_key)
+        model = _get_model(api_key, model_name, tools)
         if st.session_state.chat_session is None:
-            model = genai.GenerativeModel(
-                model_name=model_name,
-                tools=tools,
-                system_instruction=SYSTEM_INSTRUCTION
-            )
             st.session_state.chat_session = model.start_chat(enable_automatic_function_calling=False)
             st.success("System Ready: Model initialized.")
     except Exception as e:
@@ -41,16 +67,23 @@ if api_key:
 else:
     st.warning("Please enter your Google API Key in the sidebar to start.")
 
-for msg in st.session_state.messages:
-    with st.chat_message(msg["role"]):
-        if msg.get("content"):
-            st.markdown(msg["content"])
-        if msg.get("images"):
-            for img in msg["images"]:
-                st.image(img, caption="Viewport Capture", width="stretch")
-        if msg.get("logs"):
-            with st.expander("See Execution Logs"):
-                st.code(msg["logs"], language="text")
+@st.fragment
+def _render_history():
+    # Fragment-scoped so widget interactions don't re-upload every cached
+    # viewport image on each full-script rerun.
+    for msg in st.session_state.messages:
+        with st.chat_message(msg["role"]):
+            if msg.get("content"):
+                st.markdown(msg["content"])
+            if msg.get("images"):
+                for img in msg["images"]:
+                    st.image(img, caption="Viewport Capture", width="stretch")
+            if msg.get("logs"):
+                with st.expander("See Execution Logs"):
+                    st.code(msg["logs"], language="text")
+
+
+_render_history()
 
 if prompt := st.chat_input("Ex: 'Clear the scene and create a red chair'"):
     if not st.session_state.chat_session:
@@ -71,18 +104,36 @@ if prompt := st.chat_input("Ex: 'Clear the scene and create a red chair'"):
 
         with st.status("Agent is working...", expanded=True) as status:
             try:
-                response = st.session_state.chat_session.send_message(prompt)
-
-                while response.parts and any(part.function_call for part in response.parts):
+                # Stream the first reply so text paints as it arrives instead
+                # of blocking until the full response lands.
+                stream = st.session_state.chat_session.send_message(prompt, stream=True)
+                for chunk in stream:
+                    chunk_text = "".join(part.text for part in chunk.parts if part.text)
+                    if chunk_text:
+                        current_response_text += chunk_text
+                        response_placeholder.markdown(current_response_text)
+                stream.resolve()
+                response = stream
+
+                # Unset proto fields still exist; function_call.name is ""
+                # when the part carries no call.
+                fc_parts = [p for p in response.parts if p.function_call.name]
+                while fc_parts:
                     turn_count += 1
                     if turn_count > max_turns:
                         st.error(f"Max turns ({max_turns}) reached. Stopping loop.")
                         break
 
-                    response = agent.process_one_turn(
+                    # process_one_turn already scanned the next response's
+                    # parts; reuse its fc_parts instead of a second pass.
+                    # The first response's text is already streamed into the
+                    # placeholder above, so don't repeat it as a Thought.
+                    response, fc_parts = agent.process_one_turn(
                         response,
                         chat_session=st.session_state.chat_session,
                         turn_count=turn_count,
+                        fc_parts=fc_parts,
+                        render_thought=turn_count > 1,
                     )
 
                 status.update(label="Task Completed!", state="complete", expanded=False)
@@ -92,13 +143,20 @@ if prompt := st.chat_input("Ex: 'Clear the scene and create a red chair'"):
                 status.update(label="Error", state="error")
 
         if response:
-            final_text = "".join([part.text for part in response.parts if part.text])
-            st.markdown(final_text)
+            final_text = "".join(part.text for part in response.parts if part.text)
+            if turn_count:
+                # Tool turns produced a fresh final reply; the streamed
+                # first message stays in the placeholder above the status.
+                st.markdown(final_text)
+            else:
+                # No tool calls: the placeholder already streamed this text,
+                # so rewrite it in place instead of rendering a duplicate.
+                response_placeholder.markdown(final_text)
 
             msg_data = {"role": "assistant", "content": final_text}
 
             if "temp_images" in st.session_state and st.session_state.temp_images:
-                msg_data["images"] = st.session_state.temp_images
+                msg_data["images"] = list(st.session_state.temp_images)
                 del st.session_state.temp_images
 
             st.session_state.messages.append(msg_data)
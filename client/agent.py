@@ -1,13 +1,116 @@
-import base64
-import io
+import functools
+import hashlib
+import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
-import google.generativeai as genai
 import streamlit as st
-from PIL import Image
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 from client.blender_client import BlenderClient
 from client.logger import log_blender_interaction
 
+# Shared pool used to overlap Blender HTTP calls with Streamlit rendering.
+_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+
+def _submit_with_ctx(fn, *args):
+    """Submit fn to the shared pool with the caller's ScriptRunContext.
+
+    Pool workers have no Streamlit context of their own, so from a bare
+    worker thread st.session_state resolves to a throwaway state and the
+    script cache silently never works. Attaching the submitting thread's
+    context first makes session_state behave normally inside fn.
+    """
+    ctx = get_script_run_ctx()
+
+    def _run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+
+    return _EXECUTOR.submit(_run)
+
+# Retry loops often resend identical scripts; cap how many results we keep.
+_SCRIPT_CACHE_SIZE = 64
+
+# A script is replay-safe only when it reads like a pure query. Operator
+# calls, datablock creation/removal/unlinking and any assignment — plain or
+# augmented — mutate the scene; == / != / <= / >= comparisons do not.
+_MUTATION_RE = re.compile(
+    r"bpy\.ops|\.new\(|\.remove\(|\.clear\(|\.unlink\(|(?<![=!<>])=(?!=)"
+)
+
+
+def _script_cache() -> OrderedDict:
+    """Return the per-session LRU of script results, creating it on first use."""
+    if "script_cache" not in st.session_state:
+        st.session_state.script_cache = OrderedDict()
+        st.session_state.script_cache_hits = 0
+        st.session_state.script_cache_misses = 0
+    return st.session_state.script_cache
+
+
+# Gemini retiles input images to roughly 768 px anyway; anything much
+# larger only costs upload bandwidth and input-image tokens.
+_MAX_MODEL_IMAGE_SIDE = 1024
+
+
+def _bound_image_for_model(img_data: bytes, mime_type: str):
+    """Downscale/recompress a capture whose long side exceeds the cap.
+
+    Returns (bytes, mime_type); the original pair comes back untouched when
+    the capture is already small enough.
+    """
+    import io
+
+    from PIL import Image
+
+    with Image.open(io.BytesIO(img_data)) as image:
+        long_side = max(image.size)
+        if long_side <= _MAX_MODEL_IMAGE_SIDE:
+            return img_data, mime_type
+        scale = _MAX_MODEL_IMAGE_SIDE / long_side
+        resized = image.convert("RGB").resize(
+            (round(image.width * scale), round(image.height * scale)),
+            Image.LANCZOS,
+        )
+    with io.BytesIO() as buf:
+        resized.save(buf, "JPEG", quality=80)
+        return buf.getvalue(), "image/jpeg"
+
+
+# Fallback for fences embedded mid-string; drops whole fence lines. The
+# wrapped case is handled with O(1) slices below.
+_FENCE_RE = re.compile(r"^[ \t]*```[^\n]*\n?", re.MULTILINE)
+
+
+def _strip_code_fences(code: str) -> str:
+    """Remove Markdown code fences from a generated script.
+
+    Generated code is almost always fully wrapped (or not fenced at all),
+    so the common cases are two slices rather than full-string scans.
+    """
+    if "```" not in code:
+        # Function-call arguments usually arrive unfenced; one memchr-speed
+        # scan settles it.
+        return code.strip()
+    code = code.strip()
+    if code.startswith("```"):
+        if "\n" not in code:
+            # One-line fence (```import bpy```): peel the backtick runs and
+            # any language tag; there is no whole fence line to drop.
+            code = code.strip("`")
+            if code.startswith("python ") or code == "python":
+                code = code[len("python"):]
+            return code.strip()
+        code = code.split("\n", 1)[1]
+        if code.endswith("```"):
+            # The closing fence may share the last line with code.
+            code = code.rsplit("\n", 1)[0] if "\n" in code else code[:-3]
+        return code.strip()
+    return _FENCE_RE.sub("", code).strip()
+
 
 def _make_function_response_part(name: str, response_dict: dict):
     """Create a function_response part for Gemini.
@@ -27,6 +130,13 @@ def _make_function_response_part(name: str, response_dict: dict):
     }
 
 
+@functools.lru_cache(maxsize=None)
+def _fixed_function_response_part(name: str, message: str):
+    """Build-once variant of _make_function_response_part for payloads that
+    recur verbatim every turn, e.g. the screenshot acknowledgement."""
+    return _make_function_response_part(name, {"result": message})
+
+
 class GeminiAgent:
     def __init__(self, server_url: str):
         self.server_url = server_url
@@ -36,8 +146,40 @@ class GeminiAgent:
         """
         Sends Python code to the Blender server for execution.
         """
-        clean_code = code.replace("```python", "").replace("```", "").strip()
-        return self.blender_client.execute_script(clean_code)
+        clean_code = _strip_code_fences(code)
+
+        if not clean_code:
+            # Confused turns sometimes emit bare fences; don't pay a whole
+            # round trip to no-op in Blender.
+            return {"status": "success", "output": "(empty script, skipped)"}
+
+        # Replaying anything that mutates the scene would apply the change
+        # again, so only scripts that read like pure queries are cached —
+        # bpy.data mutates just as freely as bpy.ops does.
+        cacheable = _MUTATION_RE.search(clean_code) is None
+        if cacheable:
+            cache = _script_cache()
+            key = hashlib.sha256(clean_code.encode()).hexdigest()
+            cached = cache.get(key)
+            if cached is not None:
+                cache.move_to_end(key)
+                st.session_state.script_cache_hits += 1
+                return cached
+            st.session_state.script_cache_misses += 1
+
+        result = self.blender_client.execute_script(clean_code)
+
+        if cacheable:
+            if result.get("status") == "success":
+                cache[key] = result
+                if len(cache) > _SCRIPT_CACHE_SIZE:
+                    cache.popitem(last=False)
+        else:
+            # The scene may just have changed; any cached query results are
+            # stale now, so hits only ever dedupe back-to-back resends.
+            _script_cache().clear()
+
+        return result
 
     def get_viewport_screenshot(self):
         """
@@ -45,25 +187,25 @@ class GeminiAgent:
         """
         return self.blender_client.get_screenshot()
 
-    def handle_run_blender_script(self, fname: str, fargs: dict, *, chat_session):
+    def handle_run_blender_script(self, fname: str, fargs: dict, future):
         """Handle the `run_blender_script` tool invocation.
 
-        This shows the generated Python code, sends it to the Blender server, reflects
-        the execution result in the UI, and sends a function_response back to the model.
+        The Blender call is already in flight on the shared pool; this renders
+        the generated code, collects the result, and reflects it in the UI.
 
         Args:
             fname: Tool name as requested by the model.
             fargs: Tool arguments; expects a key "code" containing Python source.
-            chat_session: Active GenerativeModel chat session used to send responses.
+            future: In-flight future for the script execution result.
 
         Returns:
-            The next model response returned by ``chat_session.send_message(...)``.
+            A list of content parts answering this tool call.
         """
         code_to_run = fargs["code"]
         with st.expander(f"View Python Code ({len(code_to_run)} chars)"):
             st.code(code_to_run, language="python")
 
-        result = self.run_blender_script(code_to_run)
+        result = future.result()
         log_blender_interaction(code_to_run, result)
         api_response = {"result": result}
 
@@ -72,75 +214,131 @@ class GeminiAgent:
         elif result.get("output"):
             st.success("Code Executed Successfully")
 
-        part = _make_function_response_part(fname, api_response)
-        return chat_session.send_message([part])
+        return [_make_function_response_part(fname, api_response)]
 
-    def handle_get_viewport_screenshot(self, fname: str, *, chat_session, turn_count: int):
+    def handle_get_viewport_screenshot(self, fname: str, future, *, turn_count: int):
         """Handle the `get_viewport_screenshot` tool invocation.
 
-        This requests a viewport render from the Blender server, displays the image in
-        the UI and stores it temporarily, then sends a function_response plus the
-        captured image back to the model.
+        The render request is already in flight on the shared pool; this collects
+        the result, displays the image in the UI and stores it temporarily.
 
         Args:
             fname: Tool name as requested by the model.
-            chat_session: Active GenerativeModel chat session used to send responses.
+            future: In-flight future for the screenshot result.
             turn_count: Current turn index used for UI captions.
 
         Returns:
-            The next model response returned by ``chat_session.send_message(...)``.
+            A list of content parts answering this tool call, including the
+            captured image on success.
         """
-        result = self.get_viewport_screenshot()
+        # Imported here rather than at module scope: Streamlit re-executes
+        # every top-level import on each rerun, and these are only needed
+        # when a screenshot actually comes back.
+        import google.generativeai as genai
 
-        if result.get("status") == "success":
-            img_data = base64.b64decode(result["image_base64"])
-            image = Image.open(io.BytesIO(img_data))
+        result = future.result()
 
-            st.image(image, caption=f"Observation (Turn {turn_count})", width=400)
+        if result.get("status") == "success":
+            if "image_bytes" in result:
+                img_data = result["image_bytes"]
+            else:
+                # Older servers still wrap the image in base64 JSON.
+                try:
+                    import pybase64 as base64
+                except ImportError:
+                    import base64
+                img_data = base64.b64decode(result["image_base64"])
+            mime_type = result.get("mime_type", "image/png")
+
+            # st.image takes encoded bytes directly; no need to decode the
+            # pixels just to show them.
+            st.image(img_data, caption=f"Observation (Turn {turn_count})", width=400)
 
             if "temp_images" not in st.session_state:
-                st.session_state.temp_images = []
-            st.session_state.temp_images.append(image)
-
-            function_response_part = _make_function_response_part(
-                fname, {"result": "Image captured successfully. See attached."}
+                # Bounded: only the most recent captures of a turn are kept.
+                st.session_state.temp_images = deque(maxlen=8)
+            # The transport bytes are already compact JPEG/WebP and st.image
+            # renders bytes directly, so store them as-is — no pixel buffer
+            # ever needs decoding on this path.
+            st.session_state.temp_images.append(img_data)
+
+            function_response_part = _fixed_function_response_part(
+                fname, "Image captured successfully. See attached."
             )
-            return chat_session.send_message([
+            # Hand the model encoded bytes (a PIL image would get re-encoded
+            # by the SDK), bounded in size before upload.
+            model_bytes, model_mime = _bound_image_for_model(img_data, mime_type)
+            image_part = genai.protos.Part(
+                inline_data=genai.protos.Blob(mime_type=model_mime, data=model_bytes)
+            )
+            return [
                 function_response_part,
                 "Here is the current viewport render:",
-                image,
-            ])
+                image_part,
+            ]
 
         # Error path
         st.error(f"Vision Error: {result.get('message')}")
-        error_part = _make_function_response_part(fname, {"error": result.get("message")})
-        return chat_session.send_message([error_part])
+        return [_make_function_response_part(fname, {"error": result.get("message")})]
 
-    def process_one_turn(self, response, *, chat_session, turn_count: int):
+    def process_one_turn(self, response, *, chat_session, turn_count: int, fc_parts=None,
+                         render_thought: bool = True):
         """Process one turn of function_call handling and return the next response.
 
         Extracts any Thought text, dispatches each function_call to the appropriate
-        handler, and returns the model's subsequent response.
+        handler, then sends every function_response back to the model in a single
+        ``send_message`` round trip.
 
         Args:
             response: The current model response that may include function calls.
             chat_session: Active GenerativeModel chat session used to send responses.
             turn_count: Current turn index (1-based) for UI labeling.
+            fc_parts: Function-call parts already extracted by the caller's loop
+                condition; extracted here when omitted.
+            render_thought: Render any text in ``response`` as a Thought line;
+                the caller passes False when that text was already streamed
+                into the chat placeholder.
 
         Returns:
-            The next model response produced after handling all function calls.
+            A ``(next_response, fc_parts)`` tuple where ``fc_parts`` holds the
+            function-call parts of ``next_response`` — empty when the model is
+            done — so the caller's loop condition needs no second pass over
+            the parts.
         """
-        # Extract and render Thought text
-        thought_text = "".join([part.text for part in response.parts if getattr(part, "text", None)])
+        # Snapshot the proto-backed parts view once and partition text and
+        # function calls in a single pass (calls are skipped when the caller
+        # already extracted them).
+        parts = list(response.parts)
+        text_chunks = []
+        function_call_parts = [] if fc_parts is None else fc_parts
+        for part in parts:
+            # Proto fields always exist; an unset function_call has name "",
+            # so direct access beats getattr-with-default here.
+            if render_thought and part.text:
+                text_chunks.append(part.text)
+            if fc_parts is None and part.function_call.name:
+                function_call_parts.append(part)
+
+        thought_text = "".join(text_chunks)
         if thought_text:
             st.markdown(f"**Thought:** {thought_text}")
 
-        # Extract function_call parts
-        function_call_parts = [part for part in response.parts if getattr(part, "function_call", None)]
+        # Fire every Blender call up front so independent tools in the same
+        # turn overlap on the wire; UI rendering and the model reply below
+        # stay in call order.
+        futures = []
+        for part in function_call_parts:
+            fc = part.function_call
+            if fc.name == "run_blender_script":
+                futures.append(_submit_with_ctx(self.run_blender_script, fc.args["code"]))
+            elif fc.name == "get_viewport_screenshot":
+                futures.append(_submit_with_ctx(self.get_viewport_screenshot))
+            else:
+                futures.append(None)
 
-        next_response = response
+        response_parts = []
 
-        for part in function_call_parts:
+        for part, future in zip(function_call_parts, futures):
             fc = part.function_call
             fname = fc.name
             fargs = fc.args
@@ -148,15 +346,20 @@ class GeminiAgent:
             st.write(f"🔧 **Calling Tool:** `{fname}`")
 
             if fname == "run_blender_script":
-                next_response = self.handle_run_blender_script(fname, fargs, chat_session=chat_session)
+                response_parts.extend(self.handle_run_blender_script(fname, fargs, future))
             elif fname == "get_viewport_screenshot":
-                next_response = self.handle_get_viewport_screenshot(
-                    fname, chat_session=chat_session, turn_count=turn_count
+                response_parts.extend(
+                    self.handle_get_viewport_screenshot(fname, future, turn_count=turn_count)
                 )
             else:
                 st.warning(f"Unknown tool: {fname}")
                 # For unknown tools, return an error via function_response
-                error_part = _make_function_response_part(fname, {"error": "Unknown tool"})
-                next_response = chat_session.send_message(genai.protos.Content(parts=[error_part]))
-
-        return next_response
+                response_parts.append(_make_function_response_part(fname, {"error": "Unknown tool"}))
+
+        if response_parts:
+            next_response = chat_session.send_message(response_parts)
+            next_fc_parts = [
+                p for p in next_response.parts if p.function_call.name
+            ]
+            return next_response, next_fc_parts
+        return response, []
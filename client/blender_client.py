@@ -1,18 +1,67 @@
+import atexit
+import json
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    # Optional SIMD-accelerated JSON codec; dumps returns bytes directly.
+    import orjson
+except ImportError:
+    orjson = None
+
+# Connect fast or fail fast, but give Blender plenty of time to execute
+# scripts and render.
+REQUEST_TIMEOUT = (3, 120)
+
+
+def _dumps(payload: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode()
+
+
+def _loads(content: bytes) -> dict:
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
 
 
 class BlenderClient:
     def __init__(self, base_url: str):
         self.base_url = base_url.rstrip('/')
+        # Keep one session for the client's lifetime so the TCP connection
+        # is reused across tool calls instead of re-handshaking each time.
+        # There is a single Blender backend, so a tiny pool suffices.
+        self._session = requests.Session()
+        # Retries cover connection setup only. No status_forcelist: urllib3
+        # won't status-retry POST by default, and re-POSTing is unsafe here
+        # anyway — Blender may have accepted work that merely timed out, and
+        # a retry would run the script twice.
+        adapter = HTTPAdapter(
+            pool_connections=4, pool_maxsize=8,
+            max_retries=Retry(total=2, backoff_factor=0.1),
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        atexit.register(self._session.close)
+
+    def close(self):
+        """Release the pooled connections held by this client."""
+        self._session.close()
 
     def execute_script(self, code: str) -> dict:
         """
         Sends Python code to the Blender server for execution.
         """
         try:
-            response = requests.post(f"{self.base_url}/run", json={"code": code})
+            response = self._session.post(
+                f"{self.base_url}/run", data=_dumps({"code": code}),
+                headers={"Content-Type": "application/json"}, timeout=REQUEST_TIMEOUT,
+            )
             if response.status_code == 200:
-                return response.json()  # Expecting {"status": "success", "output": ...}
+                return _loads(response.content)  # Expecting {"status": "success", "output": ...}
             elif response.status_code == 504:
                 return {"status": "error", "message": "Timeout: Blender took too long to execute."}
             else:
@@ -27,9 +76,17 @@ class BlenderClient:
         Requests a rendered screenshot from the Blender server.
         """
         try:
-            response = requests.post(f"{self.base_url}/view", json={})
+            response = self._session.post(
+                f"{self.base_url}/view", data=_dumps({}), timeout=REQUEST_TIMEOUT,
+                headers={"Content-Type": "application/json", "Accept": "image/*"},
+            )
             if response.status_code == 200:
-                return response.json()  # Expecting {"status": "success", "image_base64": ...}
+                content_type = response.headers.get("Content-Type", "")
+                if content_type.startswith("image/"):
+                    # Binary transport: the body is the encoded image itself.
+                    return {"status": "success", "image_bytes": response.content,
+                            "mime_type": content_type}
+                return _loads(response.content)  # Older servers: {"status": "success", "image_base64": ...}
             elif response.status_code == 504:
                 return {"status": "error", "message": "Timeout: Rendering took too long."}
             else:
@@ -1,54 +1,119 @@
-import datetime
+import atexit
 import os
+import queue
+import threading
+import time
 
 from .config import LOG_DIR
 
+_REQUEST_RULE = "-" * 20 + " REQUEST (PYTHON) " + "-" * 20
+_RESPONSE_RULE = "-" * 20 + " RESPONSE " + "-" * 20
+_PROMPT_RULE = "-" * 20 + " PROMPT " + "-" * 20
+_END_RULE = "=" * 50
+
+_log_fd = None
+_log_date = None
+
+# Scene dumps can print hundreds of kB; cap what one interaction may add
+# to the log so files stay readable and the write stays cheap.
+_MAX_OUTPUT_BYTES = 64 * 1024
+
 
 def ensure_log_dir():
     if not os.path.exists(LOG_DIR):
         os.makedirs(LOG_DIR)
 
 
-def log_blender_interaction(code: str, result: dict):
-    """Logs the code and the result to a file."""
-    now = datetime.datetime.now()
-    date_str = now.strftime('%Y-%m-%d')
-    time_str = now.strftime('%H:%M:%S')
-    log_file = os.path.join(LOG_DIR, f"log_{date_str}.txt")
+def _get_log_fd():
+    """Return an O_APPEND descriptor for today's log, rotating on date change.
+
+    A raw descriptor skips Python's buffered-IO layer entirely: each entry
+    goes out as a single os.write, with no flush bookkeeping.
+    """
+    global _log_fd, _log_date
+    # time.strftime skips the datetime-object allocation of datetime.now().
+    date_str = time.strftime('%Y-%m-%d')
+    if _log_fd is None or date_str != _log_date:
+        if _log_fd is not None:
+            os.close(_log_fd)
+        ensure_log_dir()
+        _log_fd = os.open(os.path.join(LOG_DIR, f"log_{date_str}.txt"),
+                          os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        _log_date = date_str
+    return _log_fd
+
+
+# Entries are handed to a background thread so the agent loop never waits
+# on disk; the sentinel flushes and stops the writer at interpreter exit.
+_log_queue = queue.SimpleQueue()
+_SHUTDOWN = object()
+
+
+def _writer_loop():
+    while True:
+        block = _log_queue.get()
+        if block is _SHUTDOWN:
+            break
+        try:
+            os.write(_get_log_fd(), block.encode('utf-8'))
+        except Exception as e:
+            print(f"Failed to write log: {e}")
+
 
-    try:
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(f"[{time_str}] Interaction\n")
-            f.write("-" * 20 + " REQUEST (PYTHON) " + "-" * 20 + "\n")
-            f.write(code + "\n")
-            f.write("-" * 20 + " RESPONSE " + "-" * 20 + "\n")
+_writer = threading.Thread(target=_writer_loop, name="log-writer", daemon=True)
+_writer.start()
 
-            status = result.get("status", "unknown")
-            f.write(f"Status: {status}\n")
 
-            if status == "error":
-                f.write(f"Message: {result.get('message', '')}\n")
-            else:
-                # Output might be large, maybe truncate if needed, but for now full log is safer for debugging
-                f.write(f"Output: {result.get('output', '')}\n")
+def _stop_writer():
+    global _log_fd
+    _log_queue.put(_SHUTDOWN)
+    _writer.join(timeout=2)
+    if _log_fd is not None:
+        os.close(_log_fd)
+        _log_fd = None
 
-            f.write("=" * 50 + "\n\n")
-    except Exception as e:
-        print(f"Failed to write log: {e}")
+
+atexit.register(_stop_writer)
+
+
+def _write_block(block: str):
+    _log_queue.put(block)
+
+
+def log_blender_interaction(code: str, result: dict):
+    """Logs the code and the result to a file."""
+    time_str = time.strftime('%H:%M:%S')
+    status = result.get("status", "unknown")
+
+    if status == "error":
+        payload = f"Message: {result.get('message', '')}"
+    else:
+        output = result.get('output', '')
+        if len(output) > _MAX_OUTPUT_BYTES:
+            output = (f"{output[:_MAX_OUTPUT_BYTES]}\n"
+                      f"...<truncated {len(output) - _MAX_OUTPUT_BYTES} chars>")
+        payload = f"Output: {output}"
+
+    _write_block("\n".join((
+        f"[{time_str}] Interaction",
+        _REQUEST_RULE,
+        code,
+        _RESPONSE_RULE,
+        f"Status: {status}",
+        payload,
+        _END_RULE,
+        "\n",
+    )))
 
 
 def log_user_prompt(prompt: str):
     """Logs the user prompt to a file."""
-    now = datetime.datetime.now()
-    date_str = now.strftime('%Y-%m-%d')
-    time_str = now.strftime('%H:%M:%S')
-    log_file = os.path.join(LOG_DIR, f"log_{date_str}.txt")
-
-    try:
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(f"[{time_str}] USER PROMPT\n")
-            f.write("-" * 20 + " PROMPT " + "-" * 20 + "\n")
-            f.write(prompt + "\n")
-            f.write("=" * 50 + "\n\n")
-    except Exception as e:
-        print(f"Failed to write log: {e}")
+    time_str = time.strftime('%H:%M:%S')
+
+    _write_block("\n".join((
+        f"[{time_str}] USER PROMPT",
+        _PROMPT_RULE,
+        prompt,
+        _END_RULE,
+        "\n",
+    )))
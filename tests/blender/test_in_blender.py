@@ -1,11 +1,16 @@
+import os
 import sys
 import traceback
-from pathlib import Path
 
 import bpy
 
-ROOT = Path(__file__).resolve().parents[2]
-sys.path.append(str(ROOT))
+# os.path.dirname is pure string work; Path.resolve would stat every
+# component to chase symlinks.
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    # Front of the path so Blender's bundled Python finds the add-on
+    # without scanning every other entry first.
+    sys.path.insert(0, ROOT)
 
 import BlenderGeminiAgent  # noqa: E402
 